@@ -1,163 +1,349 @@
+import asyncio
+import csv
 import datetime
+import itertools
+import os
+import random
+import sys
+import time
 
-import pandas as pd
-import requests
+import ciso8601
+import diskcache
+import httpx
+import msgspec
 
 from exceptions import ApiError
 
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+MAX_CONCURRENT_REQUESTS = 10
+CSV_HEADER = ["PR №", "Title", "Author", "Created At", "Updated At",
+              "Time open", "Commits", "Comments", "Reviewers"]
+
+
+class User(msgspec.Struct):
+    login: str
+
+
+class Reviewer(msgspec.Struct):
+    login: str
+    id: int
+    type: str
+
+
+class PullRequest(msgspec.Struct):
+    number: int
+    title: str
+    user: User
+    created_at: str
+    updated_at: str
+    commits_url: str
+    comments_url: str
+    requested_reviewers: list[Reviewer]
+
+
+class Committer(msgspec.Struct):
+    name: str
+
+
+class CommitDetail(msgspec.Struct):
+    message: str
+    committer: Committer
+
+
+class Commit(msgspec.Struct):
+    sha: str
+    commit: CommitDetail
+
+
+class Comment(msgspec.Struct):
+    user: User
+    body: str
+
 
 class PullRequestsData:
     """
         Retrieve information about pull requests from a given GitHub repository.
     """
 
-    def __init__(self, repo_owner: str, repo_name: str) -> None:
+    def __init__(self, repo_owner: str, repo_name: str, cache_dir: str = ".gh_cache") -> None:
         """
             Initialize the class with the repository owner and name.
 
             :param repo_owner: Repository owner's GitHub username.
             :param repo_name: Name of the GitHub repository.
+            :param cache_dir: Directory of the on-disk response cache.
         """
         self.repo_owner = repo_owner
         self.repo_name = repo_name
+        self._cache = diskcache.Cache(cache_dir)
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._pull_requests = None
+        tokens = os.environ.get("GITHUB_TOKENS", "")
+        self._tokens = [token for token in tokens.split(",") if token]
+        self._token_cycle = itertools.cycle(self._tokens)
+        self._token_resets = {}
 
-    @staticmethod
-    def make_request(url: str) -> list:
+    def _next_token(self) -> str:
+        """
+            Pick the next token of the pool, skipping tokens whose rate limit
+            has not reset yet.
+
+            :return: The chosen personal access token.
+        """
+        token = None
+        for _ in range(len(self._tokens)):
+            token = next(self._token_cycle)
+            if time.time() >= self._token_resets.get(token, 0):
+                break
+
+        return token
+
+    async def _make_request(self, client: httpx.AsyncClient, url: str, response_type=None) -> list:
         """
             Send a GET request to the specified URL and return the response as a list.
 
+            When `response_type` is given, the body is decoded straight into
+            the declared msgspec structs, so the dozens of payload fields the
+            script never reads are skipped instead of materialized as dicts.
+
+            At most MAX_CONCURRENT_REQUESTS requests are in flight at once, to
+            stay well below GitHub's abuse-detection ceiling.
+
+            When the GITHUB_TOKENS environment variable holds a comma-separated
+            list of personal access tokens, requests are authenticated with the
+            tokens in round-robin order; an exhausted token is skipped until
+            its rate limit resets.
+
+            When GitHub throttles the request (403 with an exhausted rate
+            limit), the call sleeps until X-RateLimit-Reset and tries again
+            instead of failing the whole run.
+
+            Transient errors (429 and 5xx) are retried with an exponential
+            backoff before giving up. Responses are cached on disk together
+            with their ETag; repeat calls send If-None-Match, and a 304 reply
+            is answered from the cache without counting against the rate limit.
+
+            :param client: HTTP client shared by all requests of a single run.
             :param url: URL to send the GET request to.
-            :return: Response from the API as a list.
+            :param response_type: Optional msgspec type to decode the body into.
+            :return: Tuple of the response from the API and the URL of the next page, if any.
             :raises: ApiError if the status code of the response is not 200 (OK).
         """
-        response = requests.get(url)
+        cached = self._cache.get(url)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        token = self._next_token()
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        async with self._semaphore:
+            for attempt in range(MAX_RETRIES + 1):
+                response = await client.get(url, headers=headers)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                    break
+                await asyncio.sleep(BACKOFF_FACTOR * 2 ** attempt)
+
+        if token and response.headers.get("X-RateLimit-Remaining") == "0":
+            self._token_resets[token] = int(response.headers.get("X-RateLimit-Reset", 0))
+
+        if response.status_code == 403 and response.headers.get("X-RateLimit-Remaining") == "0":
+            reset_at = int(response.headers.get("X-RateLimit-Reset", 0))
+            # The jitter spreads out the wake-ups when several requests hit the limit at once.
+            await asyncio.sleep(max(reset_at - time.time(), 0) + 1 + random.uniform(0, 1))
+            return await self._make_request(client, url, response_type)
+
+        if response.status_code == 304:
+            return cached[1], cached[2]
 
         if response.status_code != 200:
             raise ApiError("Error receiving a response from the API")
 
-        return response.json()
+        if response_type is not None:
+            data = msgspec.json.decode(response.content, type=response_type)
+        else:
+            data = msgspec.json.decode(response.content)
+        next_link = response.links.get("next")
+        next_url = str(next_link["url"]) if next_link else None
+        etag = response.headers.get("ETag")
+        if etag:
+            self._cache.set(url, (etag, data, next_url))
+
+        return data, next_url
+
+    async def _make_paginated_request(self, client: httpx.AsyncClient, url: str, response_type=None) -> list:
+        """
+            Collect every page of a list endpoint by following the Link headers.
+
+            :param client: HTTP client shared by all requests of a single run.
+            :param url: URL of the first page.
+            :param response_type: Optional msgspec type to decode each page into.
+            :return: Concatenated items of all pages.
+        """
+        data, next_url = await self._make_request(client, url, response_type)
+        while next_url:
+            page, next_url = await self._make_request(client, next_url, response_type)
+            data.extend(page)
+
+        return data
 
     @staticmethod
     def get_time_open(created_at: datetime) -> datetime.timedelta:
         """
             Calculates the difference between the current time and the time a pull request was created.
 
-            :param created_at: The datetime object representing when the pull request was created.
+            :param created_at: The timezone-aware datetime object representing when the pull request was created.
             :return: The difference between the current time and the time the pull request was created.
         """
-        now = datetime.datetime.now()
+        now = datetime.datetime.now(datetime.timezone.utc)
         return now - created_at
 
     def list_pull_requests(self) -> list:
         """
             Get a list of pull requests for the given repository.
 
+            The result is memoized on the instance, so the API is hit only once
+            per run no matter how many consumers ask for the data.
+
+            :return: List of pull requests:
+        """
+        if self._pull_requests is None:
+            self._pull_requests = asyncio.run(self._alist_pull_requests())
+
+        return self._pull_requests
+
+    async def _alist_pull_requests(self) -> list:
+        """
+            Materialize the pull request rows produced by `_aiter_pull_requests`.
+
             :return: List of pull requests:
         """
-        pull_requests = []
-        url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/pulls"
-        data = self.make_request(url)
-
-        for pull_request in data:
-            pull_request_commits_url = pull_request["commits_url"]
-            pull_request_comments_url = pull_request["comments_url"]
-            pull_request_review_requests = [{'login': review['login'],
-                                             'id': review['id'],
-                                             'type': review['type']}
-                                            for review in
-                                            pull_request["requested_reviewers"]]
-            created_at = datetime.datetime.strptime(pull_request["created_at"], "%Y-%m-%dT%H:%M:%SZ")
-
-            pull_requests.append((pull_request["number"],
-                                  pull_request["title"],
-                                  pull_request["user"]["login"],
-                                  pull_request["created_at"],
-                                  pull_request["updated_at"],
-                                  self.get_time_open(created_at),
-                                  self.list_commits(pull_request_commits_url),
-                                  self.list_comments(pull_request_comments_url),
-                                  pull_request_review_requests))
-
-        return pull_requests
-
-    def list_commits(self, url: str) -> list:
+        return [pull_request async for pull_request in self._aiter_pull_requests()]
+
+    async def _aiter_pull_requests(self):
+        """
+            Yield pull requests page by page together with their commits and comments.
+
+            The commits and comments of every pull request of a page are
+            requested concurrently, and only one page is expanded at a time, so
+            memory use stays constant in the size of the repository.
+
+            :return: Async iterator of pull request tuples.
+        """
+        next_url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/pulls?per_page=100&state=all"
+        # asyncio.run starts a fresh event loop per call, so the semaphore cannot be reused across runs.
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+        async with httpx.AsyncClient(http2=True,
+                                     limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+                                     headers={"Accept": "application/vnd.github+json"}) as client:
+            while next_url:
+                data, next_url = await self._make_request(client, next_url, list[PullRequest])
+
+                commits, comments = await asyncio.gather(
+                    asyncio.gather(*[self.list_commits(client, pull_request.commits_url)
+                                     for pull_request in data]),
+                    asyncio.gather(*[self.list_comments(client, pull_request.comments_url)
+                                     for pull_request in data]))
+
+                for pull_request, pull_request_commits, pull_request_comments in zip(data, commits, comments):
+                    pull_request_review_requests = [{'login': review.login,
+                                                     'id': review.id,
+                                                     'type': review.type}
+                                                    for review in
+                                                    pull_request.requested_reviewers]
+                    created_at = ciso8601.parse_datetime(pull_request.created_at)
+
+                    yield (pull_request.number,
+                           pull_request.title,
+                           pull_request.user.login,
+                           pull_request.created_at,
+                           pull_request.updated_at,
+                           self.get_time_open(created_at),
+                           pull_request_commits,
+                           pull_request_comments,
+                           pull_request_review_requests)
+
+    async def list_commits(self, client: httpx.AsyncClient, url: str) -> list:
         """
             Get a list of commits for the given pull request.
 
+            The list endpoint's payload already carries the commit message and
+            committer name, so no per-commit detail requests are needed.
+
+            :param client: HTTP client shared by all requests of a single run.
             :param url: URL of the pull request's commits API endpoint.
             :return: List of commits in the format: [(commit sha, message, committer name), ...].
         """
-        commits = []
-        data = self.make_request(url)
-        for commit in data:
-            commit_url = commit["url"]
-            commit_data = self.make_request(commit_url)
-            commits.append(
-                (commit["sha"],
-                 commit_data["commit"]["message"],
-                 commit_data["commit"]["committer"]["name"]))
+        data = await self._make_paginated_request(client, f"{url}?per_page=100", list[Commit])
 
-        return commits
+        return [(commit.sha,
+                 commit.commit.message,
+                 commit.commit.committer.name)
+                for commit in data]
 
-    def list_comments(self, url: str) -> list:
+    async def list_comments(self, client: httpx.AsyncClient, url: str) -> list:
         """
             Retrieves comments for a specific pull request.
 
+            :param client: HTTP client shared by all requests of a single run.
             :param url: URL to retrieve comments for a pull request.
             :return: List of tuples, each tuple containing author and body of the comment.
         """
-        comments = []
-        data = self.make_request(url)
+        data = await self._make_paginated_request(client, f"{url}?per_page=100", list[Comment])
 
-        for comment in data:
-            comments.append(
-                (comment["user"]["login"],
-                 comment["body"]))
-
-        return comments
+        return [(comment.user.login,
+                 comment.body)
+                for comment in data]
 
     def save_pull_requests_csv(self) -> None:
         """
             Saves the pull requests information to a CSV file.
 
             The file name is constructed using the `repo_name` and `repo_owner` attributes of the object.
-            The data is retrieved from the `list_pull_requests` method and stored in a pandas DataFrame.
-            The data is then saved to a CSV file with the specified file name.
+            The rows come from the memoized `list_pull_requests`, so running
+            this together with `print_pull_requests` fetches the data from the
+            API exactly once.
         """
-        df = pd.DataFrame(self.list_pull_requests(), columns=["PR №", "Title", "Author",
-                                                              "Created At", "Updated At",
-                                                              "Time open", "Commits",
-                                                              "Comments", "Reviewers"])
-        df.to_csv(f"{self.repo_name}_{self.repo_owner}.csv", index=False)
+        with open(f"{self.repo_name}_{self.repo_owner}.csv", "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(self.list_pull_requests())
 
     def print_pull_requests(self) -> None:
         """
             Prints the pull requests information.
+
+            The output is assembled in memory first and flushed with a single
+            write, instead of one buffered print call per line.
         """
-        pull_requests = self.list_pull_requests()
+        parts = []
 
-        for number, title, user, created_at, updated_at, time_open, commits, comments, review_requests in pull_requests:
-            print("Number: ", number)
-            print("Title: ", title)
-            print("User: ", user)
-            print("Created at: ", created_at)
-            print("Updated at: ", updated_at)
-            print("Time open: ", time_open)
-            print("Commits: ")
+        for number, title, user, created_at, updated_at, time_open, commits, comments, review_requests in \
+                self.list_pull_requests():
+            parts.append(f"Number:  {number}\n")
+            parts.append(f"Title:  {title}\n")
+            parts.append(f"User:  {user}\n")
+            parts.append(f"Created at:  {created_at}\n")
+            parts.append(f"Updated at:  {updated_at}\n")
+            parts.append(f"Time open:  {time_open}\n")
+            parts.append("Commits: \n")
             for sha, message, committer in commits:
-                print("\tSHA: ", sha)
-                print("\tMessage: ", message)
-                print("\tCommitter: ", committer)
-            print("Comments: ")
+                parts.append(f"\tSHA:  {sha}\n")
+                parts.append(f"\tMessage:  {message}\n")
+                parts.append(f"\tCommitter:  {committer}\n")
+            parts.append("Comments: \n")
             for author, body in comments:
-                print("\tAuthor: ", author)
-                print("\tBody: ", body)
-            print("Review requests: ")
+                parts.append(f"\tAuthor:  {author}\n")
+                parts.append(f"\tBody:  {body}\n")
+            parts.append("Review requests: \n")
             for login, id, type in review_requests:
-                print("\tLogin: ", login)
-                print("\tId: ", id)
-                print("\tType: ", type)
-            print("*" * 80)
+                parts.append(f"\tLogin:  {login}\n")
+                parts.append(f"\tId:  {id}\n")
+                parts.append(f"\tType:  {type}\n")
+            parts.append("*" * 80 + "\n")
+
+        sys.stdout.write("".join(parts))
 
 
 if __name__ == "__main__":
@@ -1,20 +1,38 @@
+import asyncio
+import csv
 import datetime
 import os
-from unittest.mock import patch, MagicMock
+import time
+from unittest.mock import patch, MagicMock, AsyncMock
 
-import pandas as pd
+import msgspec
 import pytest
-import requests
 from freezegun import freeze_time
 
 from exceptions import ApiError
-from script import PullRequestsData
+from script import Commit, PullRequest, PullRequestsData
+
+
+def make_mock_client(response):
+    client = MagicMock()
+    client.get = AsyncMock(return_value=response)
+    return client
+
+
+def make_mock_response(status, data, headers=None, next_url=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    response.links = {"next": {"url": next_url}} if next_url else {}
+    response.content = msgspec.json.encode(data)
+    return response
 
 
 class TestListPullRequests:
     @pytest.fixture
-    def pull_requests_data(self):
-        return PullRequestsData(repo_owner="startstopstep", repo_name="test-repo")
+    def pull_requests_data(self, tmp_path):
+        return PullRequestsData(repo_owner="startstopstep", repo_name="test-repo",
+                                cache_dir=str(tmp_path / "cache"))
 
     @pytest.fixture
     def pr_response_data(self):
@@ -56,13 +74,15 @@ class TestListPullRequests:
 
     @pytest.fixture
     def mock_pull_requests(self, monkeypatch):
-        def mock_list_pull_requests(*args):
-            return [
+        async def mock_aiter_pull_requests(*args):
+            rows = [
                 (1, "Title 1", "Author 1", "2022-01-01T00:00:00Z", "2022-01-02T00:00:00Z", 1, 1, 1, ["Reviewer 1"]),
                 (2, "Title 2", "Author 2", "2022-02-01T00:00:00Z", "2022-02-02T00:00:00Z", 2, 2, 2, ["Reviewer 2"])
             ]
+            for row in rows:
+                yield row
 
-        monkeypatch.setattr('script.PullRequestsData.list_pull_requests', mock_list_pull_requests)
+        monkeypatch.setattr('script.PullRequestsData._aiter_pull_requests', mock_aiter_pull_requests)
 
     def test_initialized_with_correct_attributes(self, pull_requests_data):
         assert pull_requests_data.repo_owner == "startstopstep"
@@ -70,61 +90,172 @@ class TestListPullRequests:
 
     def test_make_request_success(self, pull_requests_data):
         url = "https://api.github.com/repos/startstopstep/test-repo/pulls"
-        response = MagicMock()
-        response.status_code = 200
-        response.json.return_value = [{'test_key': 'test_value'}]
-        with patch.object(requests, 'get', return_value=response) as mock_get:
-            result = pull_requests_data.make_request(url)
+        response = make_mock_response(200, [{'test_key': 'test_value'}])
+        client = make_mock_client(response)
 
-        mock_get.assert_called_once_with(url)
+        result, next_url = asyncio.run(pull_requests_data._make_request(client, url))
+
+        client.get.assert_called_once_with(url, headers={})
         assert result == [{'test_key': 'test_value'}]
+        assert next_url is None
+
+    def test_make_request_returns_cached_data_on_304(self, pull_requests_data):
+        url = "https://api.github.com/repos/startstopstep/test-repo/pulls"
+        pull_requests_data._cache.set(url, ('"etag_value"', [{'test_key': 'cached_value'}], None))
+        response = make_mock_response(304, None)
+        client = make_mock_client(response)
+
+        result, next_url = asyncio.run(pull_requests_data._make_request(client, url))
+
+        client.get.assert_called_once_with(url, headers={"If-None-Match": '"etag_value"'})
+        assert result == [{'test_key': 'cached_value'}]
+        assert next_url is None
+
+    def test_make_request_stores_etag_and_body_in_cache(self, pull_requests_data):
+        url = "https://api.github.com/repos/startstopstep/test-repo/pulls"
+        response = make_mock_response(200, [{'test_key': 'test_value'}], headers={"ETag": '"etag_value"'})
+        client = make_mock_client(response)
+
+        asyncio.run(pull_requests_data._make_request(client, url))
+
+        assert pull_requests_data._cache.get(url) == ('"etag_value"', [{'test_key': 'test_value'}], None)
+
+    def test_make_paginated_request_follows_next_links(self, pull_requests_data):
+        with patch("script.PullRequestsData._make_request") as mock_make_request:
+            mock_make_request.side_effect = [([{'page': 1}], "next_page_url"),
+                                             ([{'page': 2}], None)]
+
+            result = asyncio.run(pull_requests_data._make_paginated_request(MagicMock(), "first_page_url"))
+
+            assert result == [{'page': 1}, {'page': 2}]
+            assert mock_make_request.call_count == 2
 
     def test_make_request_failure(self, pull_requests_data):
         url = "https://api.github.com/repos/startstopstep/test-repo/pulls"
-        response = MagicMock()
-        response.status_code = 400
-        with patch.object(requests, 'get', return_value=response) as mock_get:
-            with pytest.raises(ApiError) as error:
-                pull_requests_data.make_request(url)
+        response = make_mock_response(400, None)
+        client = make_mock_client(response)
 
-        mock_get.assert_called_once_with(url)
+        with pytest.raises(ApiError) as error:
+            asyncio.run(pull_requests_data._make_request(client, url))
+
+        client.get.assert_called_once_with(url, headers={})
         assert str(error.value) == "Error receiving a response from the API"
 
+    def test_make_request_retries_on_server_error(self, pull_requests_data):
+        url = "https://api.github.com/repos/startstopstep/test-repo/pulls"
+        failed_response = make_mock_response(503, None)
+        success_response = make_mock_response(200, [{'test_key': 'test_value'}])
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=[failed_response, success_response])
+
+        with patch("script.asyncio.sleep", AsyncMock()):
+            result, _ = asyncio.run(pull_requests_data._make_request(client, url))
+
+        assert client.get.call_count == 2
+        assert result == [{'test_key': 'test_value'}]
+
+    def test_make_request_waits_for_rate_limit_reset(self, pull_requests_data):
+        url = "https://api.github.com/repos/startstopstep/test-repo/pulls"
+        throttled_response = make_mock_response(403, None, headers={"X-RateLimit-Remaining": "0",
+                                                                    "X-RateLimit-Reset": "0"})
+        success_response = make_mock_response(200, [{'test_key': 'test_value'}])
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=[throttled_response, success_response])
+        mock_sleep = AsyncMock()
+
+        with patch("script.asyncio.sleep", mock_sleep):
+            result, _ = asyncio.run(pull_requests_data._make_request(client, url))
+
+        mock_sleep.assert_called_once()
+        assert client.get.call_count == 2
+        assert result == [{'test_key': 'test_value'}]
+
+    def test_make_request_rotates_tokens(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("GITHUB_TOKENS", "token1,token2")
+        pull_requests_data = PullRequestsData(repo_owner="startstopstep", repo_name="test-repo",
+                                              cache_dir=str(tmp_path / "cache"))
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=[make_mock_response(200, []), make_mock_response(200, [])])
+
+        asyncio.run(pull_requests_data._make_request(client, "url_1"))
+        asyncio.run(pull_requests_data._make_request(client, "url_2"))
+
+        client.get.assert_any_call("url_1", headers={"Authorization": "Bearer token1"})
+        client.get.assert_any_call("url_2", headers={"Authorization": "Bearer token2"})
+
+    def test_next_token_skips_exhausted_tokens(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("GITHUB_TOKENS", "token1,token2")
+        pull_requests_data = PullRequestsData(repo_owner="startstopstep", repo_name="test-repo",
+                                              cache_dir=str(tmp_path / "cache"))
+        pull_requests_data._token_resets["token1"] = time.time() + 3600
+
+        assert pull_requests_data._next_token() == "token2"
+        assert pull_requests_data._next_token() == "token2"
+
+    def test_make_request_limits_concurrent_requests(self, pull_requests_data):
+        active_requests = 0
+        max_active_requests = 0
+
+        async def fake_get(url, headers=None):
+            nonlocal active_requests, max_active_requests
+            active_requests += 1
+            max_active_requests = max(max_active_requests, active_requests)
+            await asyncio.sleep(0.01)
+            active_requests -= 1
+            return make_mock_response(200, [])
+
+        client = MagicMock()
+        client.get = fake_get
+
+        async def run_requests():
+            await asyncio.gather(*[pull_requests_data._make_request(client, f"url_{number}")
+                                   for number in range(30)])
+
+        asyncio.run(run_requests())
+        assert max_active_requests <= 10
+
     def test_get_time_open_returns_correct_difference(self, pull_requests_data):
         with freeze_time("2022-01-02 12:00:00"):
-            created_at = datetime.datetime(2022, 1, 1, 11, 30, 0)
+            created_at = datetime.datetime(2022, 1, 1, 11, 30, 0, tzinfo=datetime.timezone.utc)
             assert pull_requests_data.get_time_open(created_at) == datetime.timedelta(hours=24, minutes=30)
 
     def test_list_pull_requests_returns_expected_data(self, pull_requests_data, pr_response_data):
-        mock_make_request = MagicMock(return_value=pr_response_data)
-        mock_get_time_open = MagicMock(return_value=datetime.timedelta(days=1))
-        mock_list_commits = MagicMock(return_value=["commit1", "commit2"])
-        mock_list_comments = MagicMock(return_value=["comment1", "comment2"])
+        mock_make_request = AsyncMock(return_value=(msgspec.convert(pr_response_data, type=list[PullRequest]), None))
+        mock_list_commits = AsyncMock(return_value=["commit1", "commit2"])
+        mock_list_comments = AsyncMock(return_value=["comment1", "comment2"])
 
-        with patch("script.PullRequestsData.make_request", mock_make_request):
-            with patch("script.PullRequestsData.get_time_open", mock_get_time_open):
+        with freeze_time("2021-01-03 10:00:00"):
+            with patch("script.PullRequestsData._make_request", mock_make_request):
                 with patch("script.PullRequestsData.list_commits", mock_list_commits):
                     with patch("script.PullRequestsData.list_comments", mock_list_comments):
                         pull_requests = pull_requests_data.list_pull_requests()
         assert pull_requests == [
-            (1, "Title 1", "user1", "2021-01-01T10:00:00Z", "2021-01-01T10:00:00Z", datetime.timedelta(days=1),
+            (1, "Title 1", "user1", "2021-01-01T10:00:00Z", "2021-01-01T10:00:00Z", datetime.timedelta(days=2),
              ["commit1", "commit2"], ["comment1", "comment2"], [{"login": "reviewer1", "id": 1, "type": "User"}]),
             (2, "Title 2", "user2", "2021-01-02T10:00:00Z", "2021-01-02T10:00:00Z", datetime.timedelta(days=1),
              ["commit1", "commit2"], ["comment1", "comment2"], [{"login": "reviewer2", "id": 2, "type": "User"}])]
 
     def test_list_pull_requests_handles_empty_response(self, pull_requests_data, pr_response_data):
-        mock_make_request = MagicMock(return_value=[])
-        mock_get_time_open = MagicMock(return_value=[])
-        mock_list_commits = MagicMock(return_value=[])
-        mock_list_comments = MagicMock(return_value=[])
+        mock_make_request = AsyncMock(return_value=([], None))
+        mock_list_commits = AsyncMock(return_value=[])
+        mock_list_comments = AsyncMock(return_value=[])
 
-        with patch("script.PullRequestsData.make_request", mock_make_request):
-            with patch("script.PullRequestsData.get_time_open", mock_get_time_open):
-                with patch("script.PullRequestsData.list_commits", mock_list_commits):
-                    with patch("script.PullRequestsData.list_comments", mock_list_comments):
-                        pull_requests = pull_requests_data.list_pull_requests()
+        with patch("script.PullRequestsData._make_request", mock_make_request):
+            with patch("script.PullRequestsData.list_commits", mock_list_commits):
+                with patch("script.PullRequestsData.list_comments", mock_list_comments):
+                    pull_requests = pull_requests_data.list_pull_requests()
         assert pull_requests == []
 
+    def test_list_pull_requests_fetches_data_only_once(self, pull_requests_data):
+        mock_alist_pull_requests = AsyncMock(return_value=[("pull request",)])
+
+        with patch("script.PullRequestsData._alist_pull_requests", mock_alist_pull_requests):
+            first = pull_requests_data.list_pull_requests()
+            second = pull_requests_data.list_pull_requests()
+
+        assert first == second == [("pull request",)]
+        mock_alist_pull_requests.assert_called_once()
+
     def test_list_comments_returns_expected_data(self, pull_requests_data):
         url = "https://api.github.com/repos/test_user/test_repo/pulls/1/comments"
         data = [
@@ -142,13 +273,12 @@ class TestListPullRequests:
             }
         ]
 
-        response = MagicMock()
-        response.status_code = 200
-        response.json.return_value = data
-        with patch.object(requests, 'get', return_value=response) as mock_get:
-            result = pull_requests_data.list_comments(url)
+        response = make_mock_response(200, data)
+        client = make_mock_client(response)
+
+        result = asyncio.run(pull_requests_data.list_comments(client, url))
 
-        mock_get.assert_called_once_with(url)
+        client.get.assert_called_once_with(f"{url}?per_page=100", headers={})
 
         expected_result = [
             ("test_user_1", "Test comment 1"),
@@ -158,56 +288,62 @@ class TestListPullRequests:
 
     def test_list_comments_handles_empty_response(self, pull_requests_data):
         url = "https://api.github.com/repos/test_user/test_repo/pulls/1/comments"
-        data = []
-        response = MagicMock()
-        response.status_code = 200
-        response.json.return_value = data
-        with patch.object(requests, 'get', return_value=response) as mock_get:
-            result = pull_requests_data.list_comments(url)
-
-        mock_get.assert_called_once_with(url)
+        response = make_mock_response(200, [])
+        client = make_mock_client(response)
+
+        result = asyncio.run(pull_requests_data.list_comments(client, url))
+
+        client.get.assert_called_once_with(f"{url}?per_page=100", headers={})
         assert result == []
 
     def test_list_commits_returns_expected_data(self, pull_requests_data):
-        with patch("script.PullRequestsData.make_request") as mock_make_request:
+        with patch("script.PullRequestsData._make_request") as mock_make_request:
             mock_data = [
-                {"url": "commit_url_1", "sha": "commit_sha_1"},
-                {"url": "commit_url_2", "sha": "commit_sha_2"}
-            ]
-            mock_commit_data = {
-                "commit": {
-                    "message": "commit message",
-                    "committer": {
-                        "name": "committer name"
+                {
+                    "sha": "commit_sha_1",
+                    "commit": {
+                        "message": "commit message",
+                        "committer": {
+                            "name": "committer name"
+                        }
+                    }
+                },
+                {
+                    "sha": "commit_sha_2",
+                    "commit": {
+                        "message": "commit message",
+                        "committer": {
+                            "name": "committer name"
+                        }
                     }
                 }
-            }
-            mock_make_request.side_effect = [mock_data, mock_commit_data, mock_commit_data]
+            ]
+            mock_make_request.return_value = (msgspec.convert(mock_data, type=list[Commit]), None)
 
-            result = pull_requests_data.list_commits(url="pull_request_url")
+            result = asyncio.run(pull_requests_data.list_commits(client=MagicMock(), url="pull_request_url"))
+            mock_make_request.assert_called_once()
             assert result == [
                 ("commit_sha_1", "commit message", "committer name"),
                 ("commit_sha_2", "commit message", "committer name")
             ]
 
     def test_list_commits_handles_empty_response(self, pull_requests_data):
-        with patch("script.PullRequestsData.make_request") as mock_make_request:
-            mock_data = []
-            mock_commit_data = {}
-            mock_make_request.side_effect = [mock_data, mock_commit_data, mock_commit_data]
+        with patch("script.PullRequestsData._make_request") as mock_make_request:
+            mock_make_request.return_value = ([], None)
 
-            result = pull_requests_data.list_commits(url="pull_request_url")
+            result = asyncio.run(pull_requests_data.list_commits(client=MagicMock(), url="pull_request_url"))
             assert result == []
 
     def test_save_pull_requests_csv_created_file_successfuly(self, pull_requests_data, mock_pull_requests):
         pull_requests_data.save_pull_requests_csv()
         file_path = "test-repo_startstopstep.csv"
         assert os.path.exists(file_path)
-        df = pd.read_csv(file_path)
-        assert list(df.columns) == ["PR №", "Title", "Author", "Created At", "Updated At", "Time open", "Commits",
-                                    "Comments", "Reviewers"]
-        assert len(df) == 2
-        assert df.iloc[0].tolist() == [1, "Title 1", "Author 1", "2022-01-01T00:00:00Z", "2022-01-02T00:00:00Z", 1, 1,
-                                       1, "['Reviewer 1']"]
-        assert df.iloc[1].tolist() == [2, "Title 2", "Author 2", "2022-02-01T00:00:00Z", "2022-02-02T00:00:00Z", 2, 2,
-                                       2, "['Reviewer 2']"]
+        with open(file_path, newline="", encoding="utf-8") as file:
+            rows = list(csv.reader(file))
+        assert rows[0] == ["PR №", "Title", "Author", "Created At", "Updated At", "Time open", "Commits",
+                           "Comments", "Reviewers"]
+        assert len(rows) == 3
+        assert rows[1] == ["1", "Title 1", "Author 1", "2022-01-01T00:00:00Z", "2022-01-02T00:00:00Z", "1", "1",
+                           "1", "['Reviewer 1']"]
+        assert rows[2] == ["2", "Title 2", "Author 2", "2022-02-01T00:00:00Z", "2022-02-02T00:00:00Z", "2", "2",
+                           "2", "['Reviewer 2']"]